@@ -2,17 +2,33 @@
 # https://www.doxygen.nl/manual/commands.html,
 # extracts the documentation for each command and
 # generates a C# file that exposes the information.
+# Requires the Python packages beautifulsoup4 and lxml.
 
 import bs4
+from bs4.element import Comment
+import functools
+import itertools
 import os
 from datetime import datetime
 import re
+import sys
 from enum import Enum
 from typing import Union
 
 
 ONLINE_COMMAND_HELP_LINK = "https://www.doxygen.nl/manual/commands.html"
 
+# Part of the "Click here for the corresponding HTML documentation that is generated by doxygen." sentences
+# below the examples, which get special treatment.
+HTML_DOCUMENTATION_HINT = "for the corresponding HTML documentation"
+
+# Used to replace "section" by "command" in the "See also" paragraphs, but not the "\section" command itself.
+# All variants are matched by a single pattern so that each string is scanned only once.
+SECTION_WORD_REGEX = re.compile(r"\b(?<!\\)([Ss])ection(s?)\b")
+
+# Used by split_command_header(): Matches the command, up to and including a separating space.
+COMMAND_HEADER_REGEX = re.compile(r"\\([^ \[]*)(?: |(?=\[)|$)")
+
 
 class FragmentType(Enum):
     Text = 1
@@ -26,6 +42,9 @@ class FragmentType(Enum):
 class Fragment:
     """ Represents a piece of text from the Doxygen help text of a certain type.
         The whole help text is then a list of fragments."""
+    # There are many fragments, so avoid the per-instance __dict__.
+    __slots__ = ("type", "content", "hyperlink")
+
     def __init__(self, type: FragmentType, content: str, hyperlink: str = ""):
         self.type = type
         self.content = content
@@ -38,6 +57,9 @@ class ParsedCommand:
         anchor: The html anchor ID, used to link to the command.
         help_text: The full text below the heading.
     """
+    __slots__ = ("raw_header", "help_text", "anchor", "command", "parameters",
+                 "escaped_command", "escaped_parameters", "escaped_help_text")
+
     def __init__(self, header: str, anchor: str, help_text: list[Fragment]):
         assert(len(header) > 0)
         self.raw_header = header
@@ -61,78 +83,67 @@ def escape_characters(raw_string: str):
     return raw_string.replace("\\", "\\\\").replace('"', '\\"').replace("\r", "").replace("\n", "\\n")
 
 
+def replace_section_word(match: re.Match) -> str:
+    """Keeps the case of the first letter and the plural of the matched "section" word."""
+    return ("C" if match.group(1) == "S" else "c") + "ommand" + match.group(2)
+
+
 def split_command_header(header: str):
     """ Splits the header into command and parameter. For example:
          \example['{lineno}'] <file-name>   ==> Results in "\example" and "['{lineno}'] <file-name>"
          \file [<name>]                     ==> Results in "\file" and "[<name>]"
     """
 
-    # Often, there is a space after the command that separates the argument.
-    space_pos = header.find(" ")
-    if space_pos == -1:
-        space_pos = len(header)
-
-    # However, in some cases the space is missing. In all of these cases, an opening "["
-    # comes afterwards. Exception: "\f[" should not be separated.
-    square_bracket_pos = header.find("[")
-    if square_bracket_pos == -1 or header == "\\f[":
-        square_bracket_pos = len(header)
-
-    if square_bracket_pos < space_pos:
-        cmd_end_pos = square_bracket_pos
-        param_start_pos = square_bracket_pos
-    else:
-        cmd_end_pos = space_pos
-        param_start_pos = min(space_pos + 1, len(header))
+    # Exception: "\f[" is a command on its own and must not be separated.
+    if header == "\\f[":
+        return ("f[", "")
 
-    command = header[1:cmd_end_pos]
-    parameters = header[param_start_pos:]
+    # Often, there is a space after the command that separates the argument. However, in some cases
+    # the space is missing. In all of these cases, an opening "[" comes afterwards, which then belongs
+    # to the parameters. The regex finds whichever of the two comes first in a single scan.
+    match = COMMAND_HEADER_REGEX.match(header)
+    command = match.group(1)
+    parameters = header[match.end():]
     return (command, parameters)
 
 
 def parse_doxygen_help_html(file) -> list[ParsedCommand]:
-    soup = bs4.BeautifulSoup(file, 'html.parser')
-    
-    all_parsed_commands: list[ParsedCommand] = []
+    """ The <file> should be opened in binary mode (or be the bytes of the file), so that lxml can decode it."""
+    # Everything we need is in the <body>, so do not build the tags of the <head> (scripts, styles, etc.).
+    soup = bs4.BeautifulSoup(file, 'lxml', from_encoding='utf-8', parse_only=bs4.SoupStrainer("body"))
 
     # The actual descriptions start at the first <h1> tag after the first <center> tag.
-    tag = soup.find("center")
-    tag = tag.find_next_sibling("h1")
+    header_tag = soup.find("center").find_next_sibling("h1")
 
-    while tag != None:
-        header_tag = tag
-        tag = tag.next_sibling
-        description_tags = []
-
-        # The description of one Doxygen command continues until the next <h1> tag.
-        while tag != None and tag.name != "h1":
+    # The description of one Doxygen command continues until the next <h1> tag.
+    # Walk over the siblings only once, collecting the description tags of the current command.
+    all_parsed_commands: list[ParsedCommand] = []
+    description_tags = []
+    for tag in header_tag.next_siblings:
+        if tag.name == "h1":
+            all_parsed_commands.append(parse_html_tags_of_single_command(header_tag, description_tags))
+            header_tag = tag
+            description_tags = []
+        else:
             description_tags.append(tag)
-            tag = tag.next_sibling
-        
-        parsed = parse_html_tags_of_single_command(header_tag, description_tags)
-        all_parsed_commands.append(parsed)
+    all_parsed_commands.append(parse_html_tags_of_single_command(header_tag, description_tags))
 
     return all_parsed_commands
         
 
 def parse_html_tags_of_single_command(header_tag: Union[bs4.element.Tag, bs4.element.NavigableString], 
                                       description_tags: list[Union[bs4.element.Tag, bs4.element.NavigableString]]):
-    description_text: list[Fragment] = []
-    for desc_tag in description_tags:
-        fragments = parse_recursive(desc_tag, lambda x: x)
-        description_text.extend(fragments)
-    description_text = strip_fragments(description_text)
+    description_text = strip_fragments(parse_all_children(description_tags, no_decoration, 0))
 
     # The help page ends with "Go to the next section or return to the index.", which we currently
     # still have in the command if it is the last one. Remove it.
-    for idx in range(0, len(description_text)):
-        if (idx + 5 == len(description_text)
-                and "Go to the" in description_text[idx].content
-                and "next" in description_text[idx+1].content
-                and "section or return to the" in description_text[idx+2].content):
-            description_text[idx].content = description_text[idx].content.replace("Go to the", "").rstrip()
-            description_text = description_text[:-4]
-            break
+    # Only the last five fragments can match, so there is no need to search the whole description.
+    if (len(description_text) >= 5
+            and "Go to the" in description_text[-5].content
+            and "next" in description_text[-4].content
+            and "section or return to the" in description_text[-3].content):
+        description_text[-5].content = description_text[-5].content.replace("Go to the", "").rstrip()
+        del description_text[-4:]
 
     anchor_tag = header_tag.contents[0]
     if anchor_tag.name != "a" or "anchor" not in anchor_tag["class"] or "id" not in anchor_tag.attrs:
@@ -143,22 +154,31 @@ def parse_html_tags_of_single_command(header_tag: Union[bs4.element.Tag, bs4.ele
     return ParsedCommand(header_text, anchor, description_text)
 
 
-def parse_recursive(tag: bs4.element.PageElement, decorator) -> list[Fragment]:
+def parse_recursive(tag: bs4.element.PageElement, decorator, ul_depth: int, out: list[Fragment]):
     """ Recursively goes through all elements in the given <tag> and converts its whole content
         to a string; or more precisely, to a list of fragments since important semantic information 
-        is retained.
-        The <decorator> is used to allow outer tags to modify what content is added for inner tags."""
+        is retained. The fragments are appended to <out>, so that no intermediate lists need to be
+        created for tags whose fragments are not post-processed.
+        The <decorator> is used to allow outer tags to modify what content is added for inner tags.
+        The <ul_depth> is the number of <ul> tags that enclose the <tag>, i.e. the nesting level of lists."""
 
-    if isinstance(tag, bs4.element.Comment):
-        return []
+    if isinstance(tag, Comment):
+        return
 
     elif isinstance(tag, str):
-        return [Fragment(FragmentType.Text, decorator(tag))]
+        out.append(Fragment(FragmentType.Text, decorator(tag)))
+        return
 
-    elif tag.name == "p":
+    # Looked up only once, since it is compared against for every branch below.
+    name = tag.name
+
+    # The handling of <dl> tags depends on their classes, so join them only once.
+    dl_class = ' '.join(tag['class']) if name == "dl" else None
+
+    if name == "p":
         # Note that we pass in a decorator so that every string in the paragraph gets stripped of the newline.
         # (Newlines between paragraphs are still kept!)
-        fragments = parse_all_children(tag.children, lambda x: decorator(x).replace("\n", ""))
+        fragments = parse_all_children(tag.children, newline_removing_decorator(decorator), ul_depth)
         fragments = strip_fragments(merge_fragments(fragments), " ")
 
         if len(fragments) > 0 and tag.next_sibling.name != "ul":
@@ -166,136 +186,137 @@ def parse_recursive(tag: bs4.element.PageElement, decorator) -> list[Fragment]:
         
         # Replace the double space before "for" in the "Click here   for the corresponding HTML documentation..." 
         # sentences with a single space.
+        double_space_hint = "  " + HTML_DOCUMENTATION_HINT
         for f in fragments:
-            if f.content.startswith("  for the corresponding HTML documentation"):
+            if f.content.startswith(double_space_hint):
                 f.content = f.content[1:]
 
-        return fragments
+        out.extend(fragments)
 
-    elif tag.name == "code":
-        fragments = parse_all_children(tag.children, decorator)
+    elif name == "code":
+        fragments = parse_all_children(tag.children, decorator, ul_depth)
         # In case the text in <code> contains some non-text fragments, we simply ignore that.
         # For example, the documentation for "\mainpage" contains "\ref index" in <code>, and the "\ref"
         # is additionally a hyperlink. But this is rare.
         s = "".join(f.content for f in fragments)
-        return [Fragment(FragmentType.Code, s)]
+        out.append(Fragment(FragmentType.Code, s))
 
-    elif tag.name == "em":
-        s = parse_all_children_assuming_only_text(tag.children, decorator)
-        return [Fragment(FragmentType.Emphasis, s)]
+    elif name == "em":
+        s = parse_all_children_assuming_only_text(tag.children, decorator, ul_depth)
+        out.append(Fragment(FragmentType.Emphasis, s))
 
-    elif tag.name == "dl" and ' '.join(tag['class']) == "section see":
-        if len(tag.contents) != 2:
+    elif dl_class == "section see":
+        contents = tag.contents
+        if len(contents) != 2:
             raise Exception("Expected the 'section see' to always have exactly 2 children.")
-        see_also_fragments = parse_all_children(tag.contents[1:], decorator)
+        see_also_fragments = parse_all_children(itertools.islice(contents, 1, None), decorator, ul_depth)
 
         for idx in range(0, len(see_also_fragments)):
             # The documentation often has something like "See also: Section \page for an example" which reads weird in
             # the Visual Studio autocomplete tooltips, since one cannot click there. So replace "section" with "command". 
             # But not the \section command itself. (Well, the quick info boxes actually support hyperlinks, but the 
             # autocomplete boxes do not; so simply always replace the "section".)
-            see_also_fragments[idx].content = re.sub(r"\b(?<!\\)section\b", "command", see_also_fragments[idx].content)
-            see_also_fragments[idx].content = re.sub(r"\b(?<!\\)Section\b", "Command", see_also_fragments[idx].content)
-            see_also_fragments[idx].content = re.sub(r"\b(?<!\\)sections\b", "commands", see_also_fragments[idx].content)
-            see_also_fragments[idx].content = re.sub(r"\b(?<!\\)Sections\b", "Commands", see_also_fragments[idx].content)
+            see_also_fragments[idx].content = SECTION_WORD_REGEX.sub(
+                replace_section_word, see_also_fragments[idx].content)
         
         see_also_fragments = strip_fragments(see_also_fragments)
         if len(see_also_fragments) > 0:
             see_also_fragments.insert(0, Fragment(FragmentType.Text, "See also: "))
             see_also_fragments.append(Fragment(FragmentType.Text, "\n"))
 
-        return see_also_fragments
-
-    elif tag.name == "dl" and ' '.join(tag['class']) in ["section note", "section warning"]:
-        tag_class = ' '.join(tag['class'])
+        out.extend(see_also_fragments)
 
-        fragments = []
+    elif dl_class in ["section note", "section warning"]:
         if tag.previous_sibling != "\n":
-            fragments.append(Fragment(FragmentType.Text, "\n"))
+            out.append(Fragment(FragmentType.Text, "\n"))
 
-        if "note" in tag_class:
-            fragments.append(Fragment(FragmentType.Note, "Note:"))
+        if "note" in dl_class:
+            out.append(Fragment(FragmentType.Note, "Note:"))
         else:
-            fragments.append(Fragment(FragmentType.Warning, "Warning:"))
+            out.append(Fragment(FragmentType.Warning, "Warning:"))
 
+        contents = tag.contents
         # For multiline notes/warnings, place the lines on dedicated lines. Otherwise, put it directly after the "Note:"/"Warning:" string.
-        if len(tag.contents) > 2:
-            for child in filter(lambda x: x != "\n", tag.contents[1:]):
-                child_fragments = strip_fragments(parse_all_children([child], decorator))
+        if len(contents) > 2:
+            for child in [c for c in itertools.islice(contents, 1, None) if c != "\n"]:
+                child_fragments = strip_fragments(parse_all_children([child], decorator, ul_depth))
                 if len(child_fragments) > 0:
-                    fragments.append(Fragment(FragmentType.Text, "\n\t"))
-                    fragments.extend(child_fragments)
+                    out.append(Fragment(FragmentType.Text, "\n\t"))
+                    out.extend(child_fragments)
         else:
-            children_fragments = strip_fragments(parse_all_children(tag.contents[1:], decorator))
+            children_fragments = strip_fragments(parse_all_children(itertools.islice(contents, 1, None), decorator, ul_depth))
             if len(children_fragments) > 0:
-                fragments.append(Fragment(FragmentType.Text, " "))
-                fragments.extend(children_fragments)
+                out.append(Fragment(FragmentType.Text, " "))
+                out.extend(children_fragments)
 
-        fragments.append(Fragment(FragmentType.Text, "\n"))
-        return fragments
+        out.append(Fragment(FragmentType.Text, "\n"))
 
-    elif tag.name == "dl" and ' '.join(tag['class']) == "section user":
+    elif dl_class == "section user":
         # Either some example code, or some note
-        fragments = parse_all_children(tag.children, decorator)
-        fragments.append(Fragment(FragmentType.Text, "\n"))
-        return fragments
-
-    elif tag.name == "dt":
-        fragments = parse_all_children(tag.children, decorator)
-        fragments.append(Fragment(FragmentType.Text, " "))
-        return fragments
-
-    elif tag.name == "dd":
-        fragments = merge_fragments(parse_all_children(tag.children, decorator))
+        for child in tag.children:
+            parse_recursive(child, decorator, ul_depth, out)
+        out.append(Fragment(FragmentType.Text, "\n"))
+
+    elif name == "dt":
+        for child in tag.children:
+            parse_recursive(child, decorator, ul_depth, out)
+        out.append(Fragment(FragmentType.Text, " "))
+
+    elif name == "dd":
+        fragments = merge_fragments(parse_all_children(tag.children, decorator, ul_depth))
+        line_break_hint = "\n  " + HTML_DOCUMENTATION_HINT + " that is generated by doxygen"
         for f in fragments:
-            if f.content.startswith("\n  for the corresponding HTML documentation that is generated by doxygen"):
+            if f.content.startswith(line_break_hint):
                 f.content = " " + f.content.strip()
             f.content = f.content.replace("  Click", "Click")
-        return fragments
+        out.extend(fragments)
 
-    elif tag.name == "pre" or (tag.name == "div" and ' '.join(tag['class']) == "fragment") or tag.name == "blockquote":
+    elif name == "pre" or (name == "div" and ' '.join(tag['class']) == "fragment") or name == "blockquote":
         # Tag contains some code example.
         s = tag.get_text().strip("\n")
         lines = [("   " + l) for l in s.split("\n")]
         concat_lines = "\n".join(lines) + "\n\n"
         if tag.previous_sibling != "\n":
             concat_lines = "\n" + concat_lines
-        return [Fragment(FragmentType.Code, concat_lines)]
+        out.append(Fragment(FragmentType.Code, concat_lines))
 
-    elif tag.name == "li":
-        nesting_level = sum(1 for p in tag.parents if p.name == "ul")
-        spaces = "    " * nesting_level
+    elif name == "li":
+        spaces = "    " * ul_depth
 
-        fragments = lstrip_fragments(parse_all_children(tag.children, decorator))
-        fragments.insert(0, Fragment(FragmentType.Text, spaces + "• "))
+        fragments = [Fragment(FragmentType.Text, spaces + "• ")]
+        fragments.extend(lstrip_fragments(parse_all_children(tag.children, decorator, ul_depth)))
 
         # Remove successive newlines between list elements. For example in the list in the "\showdate" command.
-        if fragments[-1].content[-1] == "\n":
+        if fragments[-1].content.endswith("\n"):
             fragments = rstrip_fragments(fragments, "\n")
-            if tag.next_sibling == None or tag.next_sibling != "\n":
+            if tag.next_sibling != "\n":
                 fragments.append(Fragment(FragmentType.Text, "\n"))
 
-        return fragments
+        out.extend(fragments)
+
+    elif name == "ul":
+        for child in tag.children:
+            parse_recursive(child, decorator, ul_depth + 1, out)
 
-    elif tag.name == "table":
-        return parse_table(tag)
+    elif name == "table":
+        out.extend(parse_table(tag))
 
-    elif tag.name == "img":
+    elif name == "img":
         # In the whole help page text, only one kind of image appears: Namely the LaTeX logo.
         # But in 2 variants (coming behind each other): For light and dark mode. We return only one.
         if "LaTeX" in tag["alt"]:
             test = tag["class"]
             if any("light-mode" in t for t in tag["class"]):
-                return [Fragment(FragmentType.Text, "LaTeX")]
+                out.append(Fragment(FragmentType.Text, "LaTeX"))
             elif any("dark-mode" in t for t in tag["class"]):
-                return [] # Only return "LaTeX" once (we do it for the light mode element already).
+                pass # Only return "LaTeX" once (we do it for the light mode element already).
             else:
                 raise Exception("Unexpected LaTeX image format.")    
         else:
             raise Exception("Unknown image")
 
-    elif tag.name == "a":
-        fragments = parse_all_children(tag.children, decorator)
+    elif name == "a":
+        fragments = parse_all_children(tag.children, decorator, ul_depth)
         if "href" in tag.attrs:
             hyperlink = tag["href"]
             if not isinstance(hyperlink, str):
@@ -306,9 +327,11 @@ def parse_recursive(tag: bs4.element.PageElement, decorator) -> list[Fragment]:
             if hyperlink.startswith("http"):
                 url = hyperlink
             elif hyperlink.startswith("#"):
-                url = f"https://www.doxygen.nl/manual/commands.html{hyperlink}"
+                url = ONLINE_COMMAND_HELP_LINK + hyperlink
             else:
                 raise Exception("Hyperlink does not start with 'http' or '#'.")
+            # The same few targets (e.g. "\ref") are linked from many places, so share the strings.
+            url = sys.intern(url)
             for f in fragments:
                 if f.hyperlink != "":
                     raise Exception("Found nested hyperlink")
@@ -322,34 +345,45 @@ def parse_recursive(tag: bs4.element.PageElement, decorator) -> list[Fragment]:
 
         # In case the hyperlink points to a Doxygen command, extract it as such.
         if len(fragments) == 1 and len(fragments[0].content) > 0 and fragments[0].content[0] == "\\":
-            return [Fragment(FragmentType.Command, fragments[0].content, fragments[0].hyperlink)]
+            out.append(Fragment(FragmentType.Command, fragments[0].content, fragments[0].hyperlink))
         else:
-            return fragments
+            out.extend(fragments)
 
-    elif tag.name == "center":
+    elif name == "center":
         # The "center" tag is only used for the "intermediate" headers like "Commands for displaying examples"
         # that separate the different command categories. We don't want them.
-        return []
+        pass
 
     else:
-        return parse_all_children(tag.children, decorator)
+        for child in tag.children:
+            parse_recursive(child, decorator, ul_depth, out)
+
+
+def no_decoration(s: str) -> str:
+    """ Decorator for parse_recursive() that keeps the strings unchanged."""
+    return s
 
 
-def parse_all_children(children, decorator) -> list[Fragment]:
+@functools.cache
+def newline_removing_decorator(decorator):
+    """ Returns a decorator for parse_recursive() that applies <decorator> and removes all newlines afterwards.
+        Cached, so that not every <p> tag creates a new function."""
+    return lambda s: decorator(s).replace("\n", "")
+
+
+def parse_all_children(children, decorator, ul_depth: int) -> list[Fragment]:
+    """ Parses all <children> into a new list of fragments, for tags that need to post-process them."""
     fragments = []
     for child in children:
-        fragments.extend(parse_recursive(child, decorator))
+        parse_recursive(child, decorator, ul_depth, fragments)
     return fragments
 
 
-def parse_all_children_assuming_only_text(children, decorator) -> str:
-    fragments = parse_all_children(children, decorator)
-    s = ""
-    for fragment in fragments:
-        if fragment.type != FragmentType.Text:
-            raise Exception("Expected only text fragments")
-        s += fragment.content
-    return s
+def parse_all_children_assuming_only_text(children, decorator, ul_depth: int) -> str:
+    fragments = parse_all_children(children, decorator, ul_depth)
+    if any(fragment.type != FragmentType.Text for fragment in fragments):
+        raise Exception("Expected only text fragments")
+    return "".join(fragment.content for fragment in fragments)
 
 
 def parse_table(table: bs4.element.Tag) -> list[Fragment]:
@@ -362,9 +396,8 @@ def parse_table(table: bs4.element.Tag) -> list[Fragment]:
     if body_tag.name != "tbody":
         raise Exception("Expected table to contain 'tbody'")
     
-    t = body_tag.contents[0]
     rows = []
-    while t != None:
+    for t in body_tag.contents:
         if t != "\n":
             columns = []
             for column_tag in t.children:
@@ -372,41 +405,38 @@ def parse_table(table: bs4.element.Tag) -> list[Fragment]:
                     column_text = column_tag.get_text().strip()
                     columns.append(column_text)
             rows.append(columns)
-        t = t.next_sibling
 
-    column_widths = [0 for c in rows[0]]
-    for row in rows:
-        if len(row) != len(column_widths):
-            raise Exception("Table has different number of columns in its rows")
-        for column_index in range(0, len(row)):
-            column_widths[column_index] = max(column_widths[column_index], len(row[column_index]))
+    num_columns = len(rows[0])
+    if any(len(row) != num_columns for row in rows):
+        raise Exception("Table has different number of columns in its rows")
+    column_widths = [max(map(len, column)) for column in zip(*rows)]
 
     # Insert a separator between the header and the table content. The first row is assumed to be the header
-    rows.insert(1, ["-" * column_widths[idx] for idx in range(0, len(column_widths))])
+    rows.insert(1, ["-" * width for width in column_widths])
 
     header_row_prefix = "    "
     column_separator = "  "
 
-    s = ""
-    for row in rows:
-        s += header_row_prefix
-        for column_index in range(0, len(row)):
-            s += row[column_index].ljust(column_widths[column_index], " ")
-            if column_index != len(row)-1:
-                s += column_separator
-        s += "\n"
-    return [Fragment(FragmentType.Text, s)]
+    # All rows have the same shape, so a single format string left-aligns and pads every cell of a row.
+    row_format = header_row_prefix + column_separator.join(f"{{:<{width}}}" for width in column_widths)
+    lines = [row_format.format(*row) for row in rows]
+    return [Fragment(FragmentType.Text, "\n".join(lines) + "\n")]
 
 
 def merge_fragments(fragments: list[Fragment]) -> list[Fragment]:
-    """Merges successive fragments of the same type and removes empty fragments."""
+    """Merges successive fragments of the same type and removes empty fragments.
+    Note: The input fragments are reused and modified in-place, so the input list should not be used afterwards."""
 
     if len(fragments) == 0:
         return []
 
     # Merge successive elements of the same type.
-    # Note: We want to deep-copy the fragments, so as not to modify the input fragments.
-    new_list = [Fragment(fragments[0].type, fragments[0].content, fragments[0].hyperlink)]
+    # Note: The input lists are always freshly created by parse_all_children() and similar temporaries, and
+    # no fragment instance is shared between different lists. So there is no need to copy the fragments.
+    new_list = [fragments[0]]
+    # Whether new_list[-1] contains the HTML_DOCUMENTATION_HINT. Tracked separately so that we do not need to
+    # search the ever growing content of the last fragment again for every merge.
+    last_has_hint = HTML_DOCUMENTATION_HINT in fragments[0].content
     for idx in range(1, len(fragments)):
         f = fragments[idx]
         do_merge = (
@@ -424,42 +454,64 @@ def merge_fragments(fragments: list[Fragment]) -> list[Fragment]:
             and not ("Click " in f.content 
                      and idx + 2 < len(fragments) 
                      and "here" in fragments[idx+1].content 
-                     and "for the corresponding HTML documentation" in fragments[idx+2].content)
-            and ("for the corresponding HTML documentation" not in new_list[-1].content or f.content.strip() == ""))
+                     and HTML_DOCUMENTATION_HINT in fragments[idx+2].content)
+            and (not last_has_hint or f.content.strip() == ""))
 
         if do_merge:
-            new_list[-1].content += f.content
+            last = new_list[-1]
+            if not last_has_hint:
+                # The hint might straddle the boundary between the two contents.
+                boundary = last.content[-(len(HTML_DOCUMENTATION_HINT) - 1):] + f.content
+                last_has_hint = HTML_DOCUMENTATION_HINT in boundary
+            last.content += f.content
         else:
-            new_list.append(Fragment(f.type, f.content, f.hyperlink))
+            new_list.append(f)
+            last_has_hint = HTML_DOCUMENTATION_HINT in f.content
 
     # Remove elements with empty content
     new_list = [f for f in new_list if len(f.content) > 0]
     return new_list
 
 
+def merge_fragments_until_stable(fragments: list[Fragment]) -> list[Fragment]:
+    """Applies merge_fragments() until the result no longer changes. A single pass is not always sufficient,
+    because empty fragments are removed only after merging and because the special handling of the "Click here..."
+    fragments depends on their neighbors."""
+    merged = merge_fragments(fragments)
+    # If the length did not change, nothing got merged or removed, so another pass would not change anything.
+    while len(merged) != len(fragments):
+        fragments = merged
+        merged = merge_fragments(fragments)
+    return merged
+
+
 def lstrip_fragments(fragments: list[Fragment], to_strip: str = None) -> list[Fragment]:
-    """Basically applies str.lstrip() to the start of the fragment list."""
-    stripped = fragments
-    while len(stripped) > 0:
-        new_stripped = [Fragment(stripped[0].type, stripped[0].content.lstrip(to_strip), stripped[0].hyperlink)]
-        new_stripped.extend(stripped[1:])
-        new_stripped = merge_fragments(new_stripped)
-        if len(stripped) == len(new_stripped):
-            return new_stripped
-        stripped = new_stripped
+    """Basically applies str.lstrip() to the start of the fragment list. The result is also merged."""
+    # Like merge_fragments(), this consumes the input list, so we can strip the merged fragments in-place.
+    # Fragments that become empty are dropped and stripping continues with the next one. Dropping them cannot
+    # enable further merges, since they are at the boundary of the list.
+    stripped = merge_fragments_until_stable(fragments)
+    num_empty = 0
+    for f in stripped:
+        f.content = f.content.lstrip(to_strip)
+        if len(f.content) > 0:
+            break
+        num_empty += 1
+    del stripped[:num_empty]
     return stripped
 
 
 def rstrip_fragments(fragments: list[Fragment], to_strip: str = None) -> list[Fragment]:
-    """Basically applies str.rstrip() to the end of the fragment list."""
-    stripped = fragments
-    while len(stripped) > 0:
-        new_stripped = stripped[0:-1]
-        new_stripped.append(Fragment(stripped[-1].type, stripped[-1].content.rstrip(to_strip), stripped[-1].hyperlink))
-        new_stripped = merge_fragments(new_stripped)
-        if len(stripped) == len(new_stripped):
-            return new_stripped
-        stripped = new_stripped
+    """Basically applies str.rstrip() to the end of the fragment list. The result is also merged."""
+    # See lstrip_fragments().
+    stripped = merge_fragments_until_stable(fragments)
+    num_empty = 0
+    for f in reversed(stripped):
+        f.content = f.content.rstrip(to_strip)
+        if len(f.content) > 0:
+            break
+        num_empty += 1
+    del stripped[len(stripped) - num_empty:]
     return stripped
 
 
@@ -467,116 +519,112 @@ def strip_fragments(fragments: list[Fragment], to_strip: str = None) -> list[Fra
     return lstrip_fragments(rstrip_fragments(fragments, to_strip), to_strip)
 
 
-def generate_text_for_csharp_file(commands: list[ParsedCommand]) -> str:
+def write_csharp_file(commands: list[ParsedCommand], out_file):
+    """Writes the C# source file with the given commands into the already opened text file <out_file>.
+    The text is written piece by piece, so the whole file content never needs to be held in memory."""
     python_file = os.path.basename(__file__)
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     max_command_len, max_parameters_len, max_anchor_len = get_max_component_lengths(commands)
 
-    s = f"// This file was automatically generated by the Python script\n"
-    s += f"// {python_file} on {current_time}.\n\n"
+    out_file.write(f"// This file was automatically generated by the Python script\n")
+    out_file.write(f"// {python_file} on {current_time}.\n\n")
 
-    s += "namespace VSDoxyHighlighter\n"
-    s += "{\n"
-    s += "  class DoxygenCommandsGeneratedFromHelpPage\n"
-    s += "  {\n"
-    s += "    public static readonly DoxygenHelpPageCommand[] cCommands = {\n"
+    out_file.write("namespace VSDoxyHighlighter\n")
+    out_file.write("{\n")
+    out_file.write("  class DoxygenCommandsGeneratedFromHelpPage\n")
+    out_file.write("  {\n")
+    out_file.write("    public static readonly DoxygenHelpPageCommand[] cCommands = {\n")
 
     for cmd in commands:
         command_padding = " " * (max_command_len - len(cmd.escaped_command))
         parameters_padding = " " * (max_parameters_len - len(cmd.escaped_parameters))
         anchor_padding = " " * (max_anchor_len - len(cmd.anchor))
 
-        s += f'      new DoxygenHelpPageCommand("{cmd.escaped_command}",{command_padding} "{cmd.escaped_parameters}",{parameters_padding} "{ONLINE_COMMAND_HELP_LINK}#{cmd.anchor}",{anchor_padding} new (object, string, string)[]{{ '
-        for fragment in cmd.escaped_help_text:
-            s += f'({map_fragment_type_to_csharp_type(fragment.type)}, "{fragment.content}", "{fragment.hyperlink}"), '
-        s += "}),\n"
+        out_file.write(f'      new DoxygenHelpPageCommand("{cmd.escaped_command}",{command_padding} "{cmd.escaped_parameters}",{parameters_padding} "{ONLINE_COMMAND_HELP_LINK}#{cmd.anchor}",{anchor_padding} new (object, string, string)[]{{ ')
+        out_file.write("".join(
+            f'({map_fragment_type_to_csharp_type(fragment.type)}, "{fragment.content}", "{fragment.hyperlink}"), '
+            for fragment in cmd.escaped_help_text))
+        out_file.write("}),\n")
 
-    s += "    };\n"
-    s += "  }\n"
-    s += "}\n"
+    out_file.write("    };\n")
+    out_file.write("  }\n")
+    out_file.write("}\n")
 
-    return s
+
+# The enumeration values to be used in the C# code for the fragment types.
+CSHARP_TYPE_OF_FRAGMENT_TYPE = {
+    FragmentType.Text: "null",
+    FragmentType.Code: "ClassificationEnum.InlineCode",
+    FragmentType.Emphasis: "ClassificationEnum.EmphasisMinor",
+    FragmentType.Note: "ClassificationEnum.Note",
+    FragmentType.Warning: "ClassificationEnum.Warning",
+    FragmentType.Command: "DoxygenHelpPageCommand.OtherTypesEnum.Command",
+}
 
 
 def map_fragment_type_to_csharp_type(type: FragmentType) -> str:
     """Returns the appropriate enumeration value to be used in the C# code."""
-    if type == FragmentType.Text:
-        return "null"
-    elif type == FragmentType.Code:
-        return "ClassificationEnum.InlineCode"
-    elif type == FragmentType.Emphasis:
-        return "ClassificationEnum.EmphasisMinor"
-    elif type == FragmentType.Note:
-        return "ClassificationEnum.Note"
-    elif type == FragmentType.Warning:
-        return "ClassificationEnum.Warning"
-    elif type == FragmentType.Command:
-        return "DoxygenHelpPageCommand.OtherTypesEnum.Command"
-    else:
+    csharp_type = CSHARP_TYPE_OF_FRAGMENT_TYPE.get(type)
+    if csharp_type is None:
         raise Exception("Unknown FragmentType")
+    return csharp_type
 
 
-def generate_debug_dump(commands: list[ParsedCommand]) -> str:
-    s = ""
+def write_debug_dump(commands: list[ParsedCommand], out_file):
+    """Writes the debug dump of the given commands into the already opened text file <out_file>."""
     for cmd in commands:
-        s += "====================================\n"
-        s += f"Command: {cmd.command}\n"
-        s += f"Parameters: {cmd.parameters}\n"
-        s += f"Anchor: {cmd.anchor}  ==>  Hyperlink: https://www.doxygen.nl/manual/commands.html#{cmd.anchor}\n"
-        s += f"Help text:\n{fragment_list_to_string_for_debug(cmd.help_text)}\n"
-        s += "------------------------------------\n\n\n"
-    return s
+        out_file.write("====================================\n")
+        out_file.write(f"Command: {cmd.command}\n")
+        out_file.write(f"Parameters: {cmd.parameters}\n")
+        out_file.write(f"Anchor: {cmd.anchor}  ==>  Hyperlink: {ONLINE_COMMAND_HELP_LINK}#{cmd.anchor}\n")
+        out_file.write(f"Help text:\n{fragment_list_to_string_for_debug(cmd.help_text)}\n")
+        out_file.write("------------------------------------\n\n\n")
+
+
+# The strings in front of and behind the content of a fragment in the debug dump, which indicate the fragment type.
+DEBUG_DUMP_DELIMITERS_OF_FRAGMENT_TYPE = {
+    FragmentType.Text: ("", ""),
+    FragmentType.Code: ("```", "```"),
+    FragmentType.Emphasis: ("*", "*"),
+    FragmentType.Note: ("!", "!"),
+    FragmentType.Warning: ("!!!", "!!!"),
+    FragmentType.Command: ("[", "]"),
+}
 
 
 def fragment_list_to_string_for_debug(fragments: list[Fragment]) -> str:
-    s = ""
+    parts = []
     for f in fragments:
-        s += "<"
-        if f.type == FragmentType.Text:
-            s += f.content
-        elif f.type == FragmentType.Code:
-            s += f"```{f.content}```"
-        elif f.type == FragmentType.Emphasis:
-            s += f"*{f.content}*"
-        elif f.type == FragmentType.Note:
-            s += f"!{f.content}!"
-        elif f.type == FragmentType.Warning:
-            s += f"!!!{f.content}!!!"
-        elif f.type == FragmentType.Command:
-            s += f"[{f.content}]"
-        else:
+        delimiters = DEBUG_DUMP_DELIMITERS_OF_FRAGMENT_TYPE.get(f.type)
+        if delimiters is None:
             raise Exception("Unknown FragmentType")
+        parts.append("<" + delimiters[0] + f.content + delimiters[1])
 
         if f.hyperlink != "":
-            s += f"§{f.hyperlink}§"
+            parts.append(f"§{f.hyperlink}§")
 
-        s += ">"
+        parts.append(">")
 
-    return s
+    return "".join(parts)
 
 
 def get_max_component_lengths(commands: list[ParsedCommand]):
-    command_len = 0
-    parameters_len = 0
-    anchors_len = 0
-    for cmd in commands:
-        command_len = max(command_len, len(cmd.escaped_command))
-        parameters_len = max(parameters_len, len(cmd.escaped_parameters))
-        anchors_len = max(anchors_len, len(cmd.anchor))
+    command_len = max((len(cmd.escaped_command) for cmd in commands), default=0)
+    parameters_len = max((len(cmd.escaped_parameters) for cmd in commands), default=0)
+    anchors_len = max((len(cmd.anchor) for cmd in commands), default=0)
     return (command_len, parameters_len, anchors_len)
 
 
 def extract_and_convert_doxygen_commands_from_html(html_filename: str, output_csharp_filename: str, output_debug_dump_filename: str):
-    with open(html_filename, 'r', encoding='utf-8') as input_file:
-        parsed_commands = parse_doxygen_help_html(input_file)
+    # Read as bytes: Decoding happens then only once in lxml instead of additionally in Python's text layer.
+    with open(html_filename, 'rb') as input_file:
+        parsed_commands = parse_doxygen_help_html(input_file.read())
     
-    csharp_text = generate_text_for_csharp_file(parsed_commands)
     with open(output_csharp_filename, 'w', encoding='utf-8') as output_file:
-        output_file.write(csharp_text)
+        write_csharp_file(parsed_commands, output_file)
 
-    dump_text = generate_debug_dump(parsed_commands)
     with open(output_debug_dump_filename, 'w', encoding='utf-8') as output_file:
-        output_file.write(dump_text)
+        write_debug_dump(parsed_commands, output_file)
 
 
 if __name__ == "__main__":